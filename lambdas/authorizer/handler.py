@@ -1,12 +1,45 @@
-import jwt
+import hashlib
+import time
+from functools import lru_cache
+
 from lambdas.common import get_logger, api_secret_key
+from lambdas.authorizer.hs256 import verify_hs256, InvalidTokenError, ExpiredTokenError
 
 log = get_logger(__name__)
 
+# Decoded tokens are reused by warm containers for this long (seconds)
+TOKEN_CACHE_TTL = 30
+TOKEN_CACHE_SIZE = 4096
+
+# Tokens without an expiry would be valid (and cacheable) forever
+REQUIRED_CLAIMS = ("exp",)
+
+# sha256(token) -> (claims, expires_at)
+_token_cache: dict[bytes, tuple[dict, float]] = {}
+
+# Encoded signing key, loaded once per container
+_SECRET: bytes | None = None
+
+
+def _get_secret() -> bytes:
+    """Get the JWT signing key as bytes (lazy initialization)."""
+    global _SECRET
+    if _SECRET is None:
+        _SECRET = api_secret_key().encode()
+    return _SECRET
+
+
+# Load the key during cold start so warm invocations never touch SSM
+try:
+    _get_secret()
+except Exception as e:
+    log.warning("Could not preload API secret key: %s", e)
+
 
+@lru_cache(maxsize=1024)
 def generate_policy(effect: str, resource: str, principal: str = "xomcloud") -> dict:
-    """Generate an IAM policy for API Gateway."""
-    return {
+    """Generate an IAM policy for API Gateway (cached; do not mutate the result)."""
+    policy = {
         "principalId": principal,
         "policyDocument": {
             "Version": "2012-10-17",
@@ -17,18 +50,62 @@ def generate_policy(effect: str, resource: str, principal: str = "xomcloud") ->
             }]
         }
     }
+    if effect == "Allow":
+        # Passed to the integration as requestContext.authorizer
+        policy["context"] = {"sub": principal}
+    return policy
+
+
+def api_resource(method_arn: str) -> str:
+    """Widen a method ARN to every route of its API stage."""
+    # arn:aws:execute-api:{region}:{account}:{api_id}/{stage}/{verb}/{path}
+    parts = method_arn.split("/", 2)
+    if len(parts) < 3:
+        return method_arn
+    return f"{parts[0]}/{parts[1]}/*"
+
+
+def _cache_token(key: bytes, claims: dict) -> None:
+    """Cache decoded claims, never past the token's own expiry."""
+    now = time.time()
+    expires_at = now + TOKEN_CACHE_TTL
+    exp = claims.get("exp")
+    if isinstance(exp, (int, float)):
+        expires_at = min(expires_at, exp)
+    if expires_at <= now:
+        return
+
+    if len(_token_cache) >= TOKEN_CACHE_SIZE:
+        # Drop expired entries first, then the oldest if still full
+        for k in [k for k, (_, t) in _token_cache.items() if t <= now]:
+            del _token_cache[k]
+        if len(_token_cache) >= TOKEN_CACHE_SIZE:
+            del _token_cache[next(iter(_token_cache))]
+
+    _token_cache[key] = (claims, expires_at)
 
 
 def decode_token(token: str) -> dict | None:
-    """Decode and validate a JWT token."""
+    """Decode and validate a JWT token (cached per warm container)."""
     try:
-        clean_token = token.replace("Bearer ", "").strip()
-        return jwt.decode(clean_token, api_secret_key(), algorithms=["HS256"])
-    except jwt.ExpiredSignatureError:
+        clean_token = (token[7:] if token.startswith("Bearer ") else token).strip()
+        key = hashlib.sha256(clean_token.encode()).digest()
+
+        cached = _token_cache.get(key)
+        if cached:
+            claims, expires_at = cached
+            if time.time() < expires_at:
+                return claims
+            del _token_cache[key]
+
+        claims = verify_hs256(clean_token, _get_secret(), require=REQUIRED_CLAIMS)
+        _cache_token(key, claims)
+        return claims
+    except ExpiredTokenError:
         log.warning("Token expired")
         return None
-    except jwt.InvalidTokenError as e:
-        log.warning(f"Invalid token: {e}")
+    except InvalidTokenError as e:
+        log.warning("Invalid token: %s", e)
         return None
 
 
@@ -49,12 +126,13 @@ def handler(event: dict, context) -> dict:
         # Decode and validate JWT
         user = decode_token(auth_token)
         if user:
-            log.info(f"Authorized user: {user.get('sub', 'unknown')}")
-            return generate_policy("Allow", method_arn, principal=str(user.get('sub', 'xomcloud')))
+            log.info("Authorized user: %s", user.get('sub', 'unknown'))
+            # Stage-wide Allow lets API Gateway reuse a cached result on any route
+            return generate_policy("Allow", api_resource(method_arn), principal=str(user.get('sub', 'xomcloud')))
         
         log.warning("Authorization denied - invalid token")
         return generate_policy("Deny", method_arn)
 
     except Exception as e:
-        log.error(f"Error in authorizer: {e}")
+        log.error("Error in authorizer: %s", e)
         return generate_policy("Deny", event.get("methodArn", "*"))
@@ -0,0 +1,77 @@
+# lambdas/authorizer/hs256.py
+# Minimal HS256 JWT verifier (stdlib hmac/hashlib are OpenSSL-backed)
+
+import base64
+import hashlib
+import hmac
+import time
+
+import orjson
+
+
+class InvalidTokenError(Exception):
+    """Token is malformed or its signature/claims do not verify."""
+
+
+class ExpiredTokenError(InvalidTokenError):
+    """Token signature is valid but its exp claim has passed."""
+
+
+def _b64url_decode(segment: bytes) -> bytes:
+    """Decode a base64url segment, restoring stripped padding."""
+    return base64.urlsafe_b64decode(segment + b"=" * (-len(segment) % 4))
+
+
+def _numeric_claim(claims: dict, name: str) -> float | None:
+    """Return a numeric date claim, rejecting non-numeric values."""
+    value = claims.get(name)
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise InvalidTokenError(f"{name} claim must be a number")
+    return value
+
+
+def verify_hs256(token: str, key: bytes, require: tuple[str, ...] = ()) -> dict:
+    """
+    Verify an HS256-signed JWT and return its claims.
+    Only exp and nbf are validated; aud, iss and iat are not checked.
+    """
+    try:
+        signing_input, _, sig_segment = token.encode("ascii").rpartition(b".")
+        header_segment, _, payload_segment = signing_input.partition(b".")
+        if not header_segment or not payload_segment or b"." in payload_segment:
+            raise InvalidTokenError("Not enough segments")
+
+        header = orjson.loads(_b64url_decode(header_segment))
+        signature = _b64url_decode(sig_segment)
+    except ValueError as e:
+        raise InvalidTokenError(f"Malformed token: {e}") from e
+
+    if not isinstance(header, dict) or header.get("alg") != "HS256":
+        raise InvalidTokenError("The specified alg value is not allowed")
+
+    expected = hmac.digest(key, signing_input, hashlib.sha256)
+    if not hmac.compare_digest(expected, signature):
+        raise InvalidTokenError("Signature verification failed")
+
+    try:
+        claims = orjson.loads(_b64url_decode(payload_segment))
+    except ValueError as e:
+        raise InvalidTokenError(f"Invalid payload: {e}") from e
+    if not isinstance(claims, dict):
+        raise InvalidTokenError("Invalid payload: not a JSON object")
+
+    for name in require:
+        if name not in claims:
+            raise InvalidTokenError(f'Token is missing the "{name}" claim')
+
+    now = time.time()
+    exp = _numeric_claim(claims, "exp")
+    if exp is not None and exp <= now:
+        raise ExpiredTokenError("Signature has expired")
+    nbf = _numeric_claim(claims, "nbf")
+    if nbf is not None and nbf > now:
+        raise InvalidTokenError("The token is not yet valid (nbf)")
+
+    return claims
@@ -2,11 +2,12 @@ from lambdas.common.logger import get_logger
 from lambdas.common.response import success, error, parse_body
 from lambdas.common.errors import AppError, AuthError, ValidationError, DownloadError, NotFoundError
 from lambdas.common.config import (
+    prefetch_params,
     api_secret_key,
     soundcloud_client_id,
     soundcloud_client_secret
 )
-from lambdas.common.s3 import upload_file, upload_bytes, generate_presigned_url
+from lambdas.common.s3 import upload_file, upload_bytes, open_upload_stream, generate_presigned_url
 
 __all__ = [
     "get_logger",
@@ -18,10 +19,12 @@ __all__ = [
     "ValidationError",
     "DownloadError",
     "NotFoundError",
+    "prefetch_params",
     "api_secret_key",
     "soundcloud_client_id",
     "soundcloud_client_secret",
     "upload_file",
     "upload_bytes",
+    "open_upload_stream",
     "generate_presigned_url"
 ]
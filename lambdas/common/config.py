@@ -1,10 +1,20 @@
 import boto3
 import os
-from functools import lru_cache
 
 _ssm = None
 PRODUCT = "xomcloud"
 
+# Environment override -> SSM parameter name
+_PARAMS = {
+    "AWS_ACCESS_KEY_ID": f"/{PRODUCT}/aws/ACCESS_KEY",
+    "AWS_SECRET_ACCESS_KEY": f"/{PRODUCT}/aws/SECRET_KEY",
+    "SOUNDCLOUD_CLIENT_ID": f"/{PRODUCT}/soundcloud/CLIENT_ID",
+    "SOUNDCLOUD_CLIENT_SECRET": f"/{PRODUCT}/soundcloud/CLIENT_SECRET",
+    "API_SECRET_KEY": f"/{PRODUCT}/api/API_SECRET_KEY",
+}
+
+_param_cache: dict[str, str] = {}
+
 
 def _get_ssm():
     """Get SSM client (lazy initialization)."""
@@ -14,11 +24,26 @@ def _get_ssm():
     return _ssm
 
 
-@lru_cache(maxsize=32)
+def prefetch_params(envs: tuple[str, ...]) -> None:
+    """
+    Fetch the given parameters (by env override name, see _PARAMS) in one SSM
+    call, skipping any set in the environment. Call from the handler module
+    with only the names that Lambda reads.
+    """
+    names = [_PARAMS[env] for env in envs if not os.environ.get(env)]
+    if not names:
+        return
+    response = _get_ssm().get_parameters(Names=names, WithDecryption=True)
+    for param in response["Parameters"]:
+        _param_cache[param["Name"]] = param["Value"]
+
+
 def get_param(name: str, decrypt: bool = True) -> str:
     """Get a parameter from SSM Parameter Store (cached)."""
-    response = _get_ssm().get_parameter(Name=name, WithDecryption=decrypt)
-    return response["Parameter"]["Value"]
+    if name not in _param_cache:
+        response = _get_ssm().get_parameter(Name=name, WithDecryption=decrypt)
+        _param_cache[name] = response["Parameter"]["Value"]
+    return _param_cache[name]
 
 
 def aws_access_key() -> str:
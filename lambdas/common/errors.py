@@ -1,13 +1,16 @@
-from dataclasses import dataclass
-
-
-@dataclass
 class AppError(Exception):
     """Base application error."""
-    message: str
-    status: int = 500
-    code: str = "INTERNAL_ERROR"
-    
+    __slots__ = ("message", "status", "code")
+
+    def __init__(self, message: str, status: int = 500, code: str = "INTERNAL_ERROR"):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.code = code
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(message={self.message!r}, status={self.status}, code={self.code!r})"
+
     def __str__(self) -> str:
         return self.message
 
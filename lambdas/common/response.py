@@ -1,4 +1,4 @@
-import json
+import orjson
 from typing import Any, Optional
 from lambdas.common.errors import AppError
 
@@ -10,39 +10,32 @@ CORS_HEADERS = {
 }
 
 
+# Body for responses without data never changes
+_SUCCESS_BODY = orjson.dumps({"success": True}).decode()
+
+
+def _response(status: int, body: str) -> dict:
+    """Build an API Gateway proxy response around a serialized body."""
+    return {"statusCode": status, "headers": CORS_HEADERS, "body": body}
+
+
+def _error_body(code: str, message: str) -> str:
+    """Serialize an error envelope."""
+    return orjson.dumps({"error": {"code": code, "message": message}}).decode()
+
+
 def success(data: Any = None, status: int = 200) -> dict:
     """Build a successful API response."""
-    return {
-        "statusCode": status,
-        "headers": CORS_HEADERS,
-        "body": json.dumps({"data": data}) if data is not None else json.dumps({"success": True})
-    }
+    if data is None:
+        return _response(status, _SUCCESS_BODY)
+    return _response(status, orjson.dumps({"data": data}).decode())
 
 
 def error(err: AppError | Exception, status: int = 500) -> dict:
     """Build an error API response."""
     if isinstance(err, AppError):
-        return {
-            "statusCode": err.status,
-            "headers": CORS_HEADERS,
-            "body": json.dumps({
-                "error": {
-                    "code": err.code,
-                    "message": err.message
-                }
-            })
-        }
-    
-    return {
-        "statusCode": status,
-        "headers": CORS_HEADERS,
-        "body": json.dumps({
-            "error": {
-                "code": "INTERNAL_ERROR",
-                "message": str(err)
-            }
-        })
-    }
+        return _response(err.status, _error_body(err.code, err.message))
+    return _response(status, _error_body("INTERNAL_ERROR", str(err)))
 
 
 def parse_body(event: dict) -> Optional[dict]:
@@ -52,4 +45,4 @@ def parse_body(event: dict) -> Optional[dict]:
         return None
     if isinstance(body, dict):
         return body
-    return json.loads(body)
+    return orjson.loads(body)
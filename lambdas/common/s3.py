@@ -1,33 +1,101 @@
 import boto3
+from boto3.s3.transfer import S3Transfer, TransferConfig
 from botocore.config import Config
 import os
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+from urllib.parse import quote
+
+from lambdas.common.logger import get_logger
+
+log = get_logger(__name__)
 
 S3_DOWNLOAD_BUCKET_NAME = os.environ.get("S3_DOWNLOAD_BUCKET_NAME", "xomcloud-downloads")
 REGION = os.environ.get("AWS_REGION", "us-east-1")
 
+# S3 requires every part but the last to be at least 5 MiB
+MULTIPART_PART_SIZE = 8 * 1024 * 1024
+
+# Parts uploaded in the background while the writer keeps producing data
+MULTIPART_CONCURRENCY = 4
+
+
+def _read_max_bandwidth() -> Optional[int]:
+    """Parse XOMCLOUD_S3_MAX_BANDWIDTH; bad values are logged and ignored."""
+    raw = os.environ.get("XOMCLOUD_S3_MAX_BANDWIDTH")
+    if not raw:
+        return None
+    try:
+        value = int(raw)
+    except ValueError:
+        log.warning("Ignoring invalid XOMCLOUD_S3_MAX_BANDWIDTH: %r", raw)
+        return None
+    if value < 0:
+        log.warning("Ignoring negative XOMCLOUD_S3_MAX_BANDWIDTH: %r", raw)
+        return None
+    return value or None
+
+
+# Optional cap on upload_file throughput in bytes/sec (unset or 0 = uncapped);
+# the streamed zip upload (MultipartUploadWriter) is not throttled
+MAX_BANDWIDTH = _read_max_bandwidth()
+
+# Managed uploads (upload_file): 16 MiB parts, 16 threads per file
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=16 * 1024 * 1024,
+    max_concurrency=16,
+    use_threads=True,
+    max_bandwidth=MAX_BANDWIDTH
+)
+
 _s3_client = None
+_transfer = None
+_part_executor = None
 
 
 def get_s3_client():
-    """Get configured S3 client with signature v4 (required for KMS)."""
+    """Get the shared S3 client with signature v4 (required for KMS)."""
     global _s3_client
     if _s3_client is None:
         _s3_client = boto3.client(
             "s3",
             region_name=REGION,
-            config=Config(signature_version='s3v4')
+            config=Config(
+                signature_version='s3v4',
+                # Room for concurrent multipart parts and transfer threads
+                max_pool_connections=32,
+                tcp_keepalive=True,
+                retries={"max_attempts": 3, "mode": "adaptive"}
+            )
         )
     return _s3_client
 
 
+def _get_transfer() -> S3Transfer:
+    """Get the shared transfer manager so its thread pool outlives each upload."""
+    global _transfer
+    if _transfer is None:
+        _transfer = S3Transfer(get_s3_client(), TRANSFER_CONFIG)
+    return _transfer
+
+
+def _get_part_executor() -> ThreadPoolExecutor:
+    """Get the thread pool for multipart part uploads (lazy initialization)."""
+    global _part_executor
+    if _part_executor is None:
+        _part_executor = ThreadPoolExecutor(max_workers=MULTIPART_CONCURRENCY, thread_name_prefix="s3-part")
+    return _part_executor
+
+
 def upload_file(file_path: str, key: str, content_type: str = "application/zip") -> str:
     """Upload a file to S3 and return the key."""
-    s3 = get_s3_client()
-    s3.upload_file(
+    _get_transfer().upload_file(
         file_path,
         S3_DOWNLOAD_BUCKET_NAME,
         key,
-        ExtraArgs={"ContentType": content_type}
+        extra_args={"ContentType": content_type}
     )
     return key
 
@@ -44,11 +112,120 @@ def upload_bytes(data: bytes, key: str, content_type: str = "application/zip") -
     return key
 
 
-def generate_presigned_url(key: str, expires_in: int = 3600) -> str:
-    """Generate a presigned download URL (signature v4 for KMS support)."""
+def generate_presigned_url(key: str, expires_in: int = 3600, filename: Optional[str] = None) -> str:
+    """
+    Generate a presigned download URL (signature v4 for KMS support).
+    If filename is given, the browser is told to save the object under that name.
+    """
     s3 = get_s3_client()
+    params = {"Bucket": S3_DOWNLOAD_BUCKET_NAME, "Key": key}
+    if filename:
+        params["ResponseContentDisposition"] = f"attachment; filename*=UTF-8''{quote(filename)}"
     return s3.generate_presigned_url(
         "get_object",
-        Params={"Bucket": S3_DOWNLOAD_BUCKET_NAME, "Key": key},
+        Params=params,
         ExpiresIn=expires_in
     )
+
+
+class MultipartUploadWriter:
+    """
+    Write-only file object that streams bytes into an S3 multipart upload.
+    Full parts upload in the background (at most MULTIPART_CONCURRENCY in
+    flight), so producing data overlaps with sending it.
+    """
+
+    def __init__(self, key: str, content_type: str = "application/zip", part_size: int = MULTIPART_PART_SIZE):
+        self.key = key
+        self._s3 = get_s3_client()
+        self._part_size = part_size
+        self._buffer = bytearray()
+        self._parts: list[dict] = []
+        self._pending: deque[Future] = deque()
+        self._upload_id = self._s3.create_multipart_upload(
+            Bucket=S3_DOWNLOAD_BUCKET_NAME,
+            Key=key,
+            ContentType=content_type
+        )["UploadId"]
+
+    def write(self, data: bytes) -> int:
+        """Buffer data, queueing a part upload each time a full part is available."""
+        self._buffer += data
+        while len(self._buffer) >= self._part_size:
+            with memoryview(self._buffer) as view:
+                part = bytes(view[:self._part_size])
+            del self._buffer[:self._part_size]
+            self._queue_part(part)
+        return len(data)
+
+    def flush(self) -> None:
+        """No-op; parts are sent as soon as they fill up."""
+
+    def _queue_part(self, body: bytes) -> None:
+        # Bound memory: wait for the oldest part once the window is full
+        if len(self._pending) >= MULTIPART_CONCURRENCY:
+            self._parts.append(self._pending.popleft().result())
+        number = len(self._parts) + len(self._pending) + 1
+        self._pending.append(_get_part_executor().submit(self._upload_part, number, body))
+
+    def _upload_part(self, number: int, body: bytes) -> dict:
+        response = self._s3.upload_part(
+            Bucket=S3_DOWNLOAD_BUCKET_NAME,
+            Key=self.key,
+            UploadId=self._upload_id,
+            PartNumber=number,
+            Body=body
+        )
+        return {"ETag": response["ETag"], "PartNumber": number}
+
+    def _drain(self) -> None:
+        while self._pending:
+            self._parts.append(self._pending.popleft().result())
+
+    def complete(self) -> str:
+        """Upload any remaining bytes as the final part and finish the upload."""
+        try:
+            if self._buffer or not (self._parts or self._pending):
+                self._queue_part(bytes(self._buffer))
+                self._buffer.clear()
+            self._drain()
+            self._s3.complete_multipart_upload(
+                Bucket=S3_DOWNLOAD_BUCKET_NAME,
+                Key=self.key,
+                UploadId=self._upload_id,
+                MultipartUpload={"Parts": self._parts}
+            )
+        except BaseException:
+            # A failed part or completion would otherwise leave billed parts behind
+            self.abort()
+            raise
+        return self.key
+
+    def abort(self) -> None:
+        """Discard the upload and any parts already sent."""
+        self._buffer.clear()
+        for future in self._pending:
+            future.cancel()
+        for future in self._pending:
+            if not future.cancelled():
+                future.exception()
+        self._pending.clear()
+        self._s3.abort_multipart_upload(
+            Bucket=S3_DOWNLOAD_BUCKET_NAME,
+            Key=self.key,
+            UploadId=self._upload_id
+        )
+
+    def __enter__(self) -> "MultipartUploadWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.complete()
+        else:
+            self.abort()
+
+
+def open_upload_stream(key: str, content_type: str = "application/zip") -> MultipartUploadWriter:
+    """Open a writable stream that uploads to S3 as it is written."""
+    return MultipartUploadWriter(key, content_type=content_type)
@@ -4,32 +4,130 @@
 import asyncio
 import os
 import tempfile
+import shutil
 import zipfile
-import uuid
 import re
 from pathlib import Path
-from dataclasses import dataclass
-from typing import Optional
-from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+from dataclasses import dataclass, field
+from typing import AsyncIterator, BinaryIO, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager
 
 from lambdas.common import get_logger, DownloadError, soundcloud_client_id
 
 log = get_logger(__name__)
 
-# Thread pool for blocking operations (scdl is not truly async)
-_executor = ThreadPoolExecutor(max_workers=4)
 
+def _read_download_workers(default: int = 16) -> int:
+    """Parse XOMCLOUD_DL_WORKERS; bad values are logged and replaced by the default."""
+    raw = os.environ.get("XOMCLOUD_DL_WORKERS")
+    if not raw:
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        log.warning("Ignoring invalid XOMCLOUD_DL_WORKERS: %r", raw)
+        return default
+    if value < 1:
+        log.warning("Ignoring non-positive XOMCLOUD_DL_WORKERS: %r", raw)
+        return default
+    return value
 
-@dataclass
+
+# Concurrent downloads; mostly network-bound, so more threads than vCPUs
+DOWNLOAD_WORKERS = _read_download_workers()
+
+# Thread pool for blocking operations (scdl is not truly async).
+# Process-global so warm invocations reuse threads; created on first download.
+_executor = None
+
+# Audio is already compressed, so zip entries are stored unless
+# XOMCLOUD_ZIP_COMPRESS=1 (useful when debugging with non-audio payloads)
+ZIP_COMPRESSION = zipfile.ZIP_DEFLATED if os.environ.get("XOMCLOUD_ZIP_COMPRESS") == "1" else zipfile.ZIP_STORED
+
+# Copy size for zip entries (ZipFile.write copies in 8 KiB chunks)
+ZIP_COPY_CHUNK = 1024 * 1024
+
+# Filename sanitization patterns
+_UNSAFE_RE = re.compile(r'[<>:"/\\|?*]')
+_WS_RE = re.compile(r'\s+')
+
+# scdl options identical for every track (per-track values are added on top)
+_SCDL_DEFAULTS = MappingProxyType({
+    # Disable most options
+    "C": False,
+    "a": False,
+    "add_description": False,
+    "addtimestamp": False,
+    "addtofile": False,
+    "auth_token": None,
+    "c": False,
+    "debug": False,
+    "download_archive": None,
+    "error": False,
+    "extract_artist": False,
+    "f": False,
+    "flac": False,
+    "force_metadata": False,
+    "hide_progress": True,
+    "hidewarnings": True,
+    "max_size": None,
+    "me": False,
+    "min_size": None,
+    "n": None,
+    "no_album_tag": False,
+    "no_original": False,
+    "no_playlist": True,
+    "no_playlist_folder": True,
+    "o": None,
+    "only_original": False,
+    "onlymp3": True,  # Prefer MP3
+    "opus": False,
+    "original_art": False,
+    "original_metadata": False,
+    "original_name": False,
+    "overwrite": True,
+    "p": False,
+    "playlist_name_format": "%(playlist)s - %(title)s",
+    "r": False,
+    "strict_playlist": False,
+    "sync": None,
+    "s": None,
+    "t": False,
+    "yt_dlp_args": "",
+})
+
+# Audio formats scdl may produce, with the Content-Type to serve them as
+AUDIO_CONTENT_TYPES = {
+    ".mp3": "audio/mpeg",
+    ".m4a": "audio/mp4",
+    ".wav": "audio/wav",
+    ".opus": "audio/opus",
+    ".flac": "audio/flac",
+    ".ogg": "audio/ogg",
+}
+
+
+@dataclass(slots=True, frozen=True)
 class Track:
     """Represents a track to download."""
     id: str
     url: str
     title: str
     artist: str
+    _safe_filename: str = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        # Derived once; the track is immutable
+        object.__setattr__(self, "_safe_filename", self._build_safe_filename())
     
     @property
     def safe_filename(self) -> str:
+        """Safe filename: Artist - Title"""
+        return self._safe_filename
+    
+    def _build_safe_filename(self) -> str:
         """Generate a safe filename: Artist - Title"""
         safe_artist = self._sanitize(self.artist)
         safe_title = self._sanitize(self.title)
@@ -50,9 +148,9 @@ class Track:
         if not s:
             return ""
         # Remove characters that are unsafe for filenames
-        s = re.sub(r'[<>:"/\\|?*]', '', s)
+        s = _UNSAFE_RE.sub('', s)
         # Replace multiple spaces with single space
-        s = re.sub(r'\s+', ' ', s)
+        s = _WS_RE.sub(' ', s)
         return s.strip()
 
 
@@ -65,6 +163,14 @@ class DownloadResult:
     error: Optional[str] = None
 
 
+def _get_executor() -> ThreadPoolExecutor:
+    """Get the download thread pool (lazy initialization)."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS, thread_name_prefix="dl")
+    return _executor
+
+
 def _download_track_sync(track: Track, output_dir: str, client_id: str) -> DownloadResult:
     """
     Synchronous download using scdl (runs in thread pool).
@@ -74,63 +180,24 @@ def _download_track_sync(track: Track, output_dir: str, client_id: str) -> Downl
         
         Path(output_dir).mkdir(parents=True, exist_ok=True)
         
-        # Build scdl arguments
+        # Build scdl arguments: shared defaults plus the per-track values
         scdl_args = {
+            **_SCDL_DEFAULTS,
             "l": track.url,
             "path": Path(output_dir),
-            "name_format": track.safe_filename,
+            # ID prefix keeps names unique in the shared batch directory
+            "name_format": f"{track.id}_{track.safe_filename}",
             "client_id": client_id,
-            # Disable most options
-            "C": False,
-            "a": False,
-            "add_description": False,
-            "addtimestamp": False,
-            "addtofile": False,
-            "auth_token": None,
-            "c": False,
-            "debug": False,
-            "download_archive": None,
-            "error": False,
-            "extract_artist": False,
-            "f": False,
-            "flac": False,
-            "force_metadata": False,
-            "hide_progress": True,
-            "hidewarnings": True,
-            "max_size": None,
-            "me": False,
-            "min_size": None,
-            "n": None,
-            "no_album_tag": False,
-            "no_original": False,
-            "no_playlist": True,
-            "no_playlist_folder": True,
-            "o": None,
-            "only_original": False,
-            "onlymp3": True,  # Prefer MP3
-            "opus": False,
-            "original_art": False,
-            "original_metadata": False,
-            "original_name": False,
-            "overwrite": True,
-            "p": False,
-            "playlist_name_format": "%(playlist)s - %(title)s",
-            "r": False,
-            "strict_playlist": False,
-            "sync": None,
-            "s": None,
-            "t": False,
-            "yt_dlp_args": "",
         }
         
-        log.info(f"Downloading: {track.artist} - {track.title}")
+        log.info("Downloading: %s - %s", track.artist, track.title)
         download_url(track.url, **scdl_args)
         
         # Find the downloaded file
         downloaded_file = _find_downloaded_file(output_dir, track)
         
         if downloaded_file:
-            log.info(f"✓ Downloaded: {track.safe_filename}")
+            log.info("✓ Downloaded: %s", track.safe_filename)
             return DownloadResult(track=track, success=True, file_path=downloaded_file)
         
         return DownloadResult(
@@ -143,45 +210,47 @@ def _download_track_sync(track: Track, output_dir: str, client_id: str) -> Downl
         log.error("scdl not installed")
         return DownloadResult(track=track, success=False, error="scdl not installed")
     except Exception as e:
-        log.error(f"Failed to download {track.title}: {e}")
+        log.error("Failed to download %s: %s", track.title, e)
         return DownloadResult(track=track, success=False, error=str(e))
 
 
 def _find_downloaded_file(output_dir: str, track: Track) -> Optional[str]:
-    """Find the downloaded file in output directory."""
-    audio_extensions = ('.mp3', '.m4a', '.wav', '.opus', '.flac', '.ogg')
-    safe_name = track.safe_filename.lower()
+    """Find the track's file in output directory by its "{id}_" name prefix."""
+    # Prefix only: scdl trims long (e.g. non-ASCII) names to 240 bytes, and
+    # IDs are digits-only, so "{id}_" cannot match another track's file
+    audio_extensions = tuple(AUDIO_CONTENT_TYPES)
+    prefix = f"{track.id}_"
     
-    for fname in os.listdir(output_dir):
-        ext = os.path.splitext(fname)[1].lower()
-        if ext not in audio_extensions:
-            continue
-        
-        path = os.path.join(output_dir, fname)
-        fname_lower = fname.lower()
-        
-        # Check if filename matches our expected pattern
-        if safe_name[:20].lower() in fname_lower:
-            return path
-        
-        # Also check by track ID
-        if track.id in fname:
-            return path
-    
-    # If still not found, return the first audio file (last resort)
-    for fname in os.listdir(output_dir):
-        ext = os.path.splitext(fname)[1].lower()
-        if ext in audio_extensions:
-            return os.path.join(output_dir, fname)
+    with os.scandir(output_dir) as entries:
+        for entry in entries:
+            if entry.name.startswith(prefix) and entry.name.lower().endswith(audio_extensions):
+                return entry.path
     
     return None
 
 
+def _add_to_zip(zf: zipfile.ZipFile, file_path: str, arcname: str) -> None:
+    """Copy a file into the archive in large chunks."""
+    zinfo = zipfile.ZipInfo.from_file(file_path, arcname)
+    zinfo.compress_type = zf.compression
+    with open(file_path, "rb", buffering=0) as src, zf.open(zinfo, "w") as dst:
+        shutil.copyfileobj(src, dst, ZIP_COPY_CHUNK)
+
+
+def _get_client_id() -> Optional[str]:
+    """Get the SoundCloud client ID from SSM, or None to let scdl resolve one."""
+    try:
+        return soundcloud_client_id()
+    except Exception as e:
+        log.warning("Could not get client_id from SSM: %s", e)
+        return None
+
+
 async def download_track(track: Track, output_dir: str, client_id: str) -> DownloadResult:
     """Download a single track asynchronously."""
-    loop = asyncio.get_event_loop()
+    loop = asyncio.get_running_loop()
     return await loop.run_in_executor(
-        _executor, 
+        _get_executor(),
         _download_track_sync, 
         track, 
         output_dir,
@@ -189,55 +258,79 @@ async def download_track(track: Track, output_dir: str, client_id: str) -> Downl
     )
 
 
-async def download_tracks(tracks: list[Track]) -> tuple[str, list[DownloadResult]]:
+@asynccontextmanager
+async def download_single(track: Track) -> AsyncIterator[DownloadResult]:
     """
-    Download multiple tracks and create a zip file.
-    Returns (zip_path, results).
+    Download one track to a temp directory and yield its result.
+    The downloaded file is removed when the context exits.
+    """
+    temp_dir = tempfile.mkdtemp(prefix="xomcloud_")
+    try:
+        yield await download_track(track, temp_dir, _get_client_id())
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+async def download_tracks(
+    tracks: list[Track],
+    out: BinaryIO,
+    zip_compression: int = ZIP_COMPRESSION,
+) -> list[DownloadResult]:
+    """
+    Download multiple tracks and write them as a zip archive to `out`.
+    `out` only needs write(); it can be a file or an S3 upload stream.
+    `zip_compression` defaults to ZIP_STORED (see ZIP_COMPRESSION).
+    Returns the per-track results.
     """
     if not tracks:
         raise DownloadError("No tracks provided")
     
-    # Get SoundCloud client ID from SSM
-    try:
-        client_id = soundcloud_client_id()
-    except Exception as e:
-        log.warning(f"Could not get client_id from SSM: {e}")
-        client_id = None
+    client_id = _get_client_id()
     
     # Create temp directory for this batch
     temp_dir = tempfile.mkdtemp(prefix="xomcloud_")
-    log.info(f"Downloading {len(tracks)} tracks to {temp_dir}")
+    log.info("Downloading %d tracks to %s", len(tracks), temp_dir)
     
-    # Download all tracks concurrently
-    # Each track gets its own subdirectory to avoid naming conflicts
-    tasks = []
-    for i, track in enumerate(tracks):
-        track_dir = os.path.join(temp_dir, f"track_{i}")
-        os.makedirs(track_dir, exist_ok=True)
-        tasks.append(download_track(track, track_dir, client_id))
-    
-    results = await asyncio.gather(*tasks)
-    
-    # Collect successful downloads
-    successful = [r for r in results if r.success and r.file_path]
-    
-    if not successful:
-        raise DownloadError("All downloads failed")
-    
-    # Create zip file with proper names
-    zip_filename = f"xomcloud_{uuid.uuid4().hex[:8]}.zip"
-    zip_path = os.path.join(temp_dir, zip_filename)
-    
-    log.info(f"Creating zip with {len(successful)} tracks")
-    
-    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
-        for result in successful:
-            # Use the track's safe filename for the zip entry
-            original_ext = os.path.splitext(result.file_path)[1]
-            arcname = f"{result.track.safe_filename}{original_ext}"
+    # Pool futures (not asyncio wrappers) so cleanup can wait on the threads
+    futures: dict[str, Future] = {}
+    try:
+        # Download tracks concurrently into the shared batch directory; the
+        # pool's DOWNLOAD_WORKERS threads bound how many run at once.
+        # Repeated IDs share one download (they would write the same file)
+        executor = _get_executor()
+        for track in tracks:
+            if track.id not in futures:
+                futures[track.id] = executor.submit(_download_track_sync, track, temp_dir, client_id)
+        added: list[str] = []
+        
+        # Add each track to the zip as soon as it finishes downloading
+        with zipfile.ZipFile(out, "w", zip_compression, allowZip64=True) as zf:
+            for next_done in asyncio.as_completed([asyncio.wrap_future(f) for f in futures.values()]):
+                result = await next_done
+                if not (result.success and result.file_path):
+                    continue
+                
+                # Use the track's safe filename for the zip entry
+                original_ext = os.path.splitext(result.file_path)[1]
+                arcname = f"{result.track.safe_filename}{original_ext}"
+                
+                # Copying (and S3 part uploads) block, so keep them off the loop
+                await asyncio.to_thread(_add_to_zip, zf, result.file_path, arcname)
+                # Free /tmp right away; only the zip needs the bytes now
+                os.unlink(result.file_path)
+                added.append(arcname)
             
-            zf.write(result.file_path, arcname)
-            log.info(f"  Added: {arcname}")
-    
-    log.info(f"Created zip: {zip_path} ({len(successful)}/{len(tracks)} tracks)")
-    return zip_path, results
+            if not added:
+                raise DownloadError("All downloads failed")
+        
+        # One line for the whole batch instead of one per entry
+        log.info("Created zip (%d/%d tracks): %s", len(added), len(tracks), ", ".join(added))
+        return [futures[track.id].result() for track in tracks]
+    finally:
+        # If zipping fails part-way, drop queued downloads and wait for the
+        # running ones; a thread still writing would outlive the rmtree and
+        # leave its file in /tmp for the next warm invocation
+        running = [f for f in futures.values() if not f.cancel() and not f.done()]
+        if running:
+            await asyncio.wait([asyncio.wrap_future(f) for f in running])
+        shutil.rmtree(temp_dir, ignore_errors=True)
@@ -3,8 +3,7 @@
 
 import asyncio
 import os
-import uuid
-import json
+import re
 from datetime import datetime
 
 from lambdas.common import (
@@ -12,21 +11,46 @@ from lambdas.common import (
     success,
     error,
     parse_body,
+    prefetch_params,
     ValidationError,
     DownloadError,
     upload_file,
+    open_upload_stream,
     generate_presigned_url
 )
-from lambdas.download_tracks.downloader import Track, download_tracks
+from lambdas.download_tracks.downloader import (
+    AUDIO_CONTENT_TYPES,
+    DownloadResult,
+    Track,
+    download_single,
+    download_tracks
+)
 
 log = get_logger(__name__)
 
+# Warm the SoundCloud client ID during cold start (the only secret this
+# Lambda reads); misses fall back to get_parameter
+try:
+    prefetch_params(("SOUNDCLOUD_CLIENT_ID",))
+except Exception as e:
+    log.warning("Could not prefetch SSM parameters: %s", e)
+
 # Maximum tracks per request (limited for reliability with long tracks)
 MAX_TRACKS = 5
 
 # S3 presigned URL expiry (1 hour)
 PRESIGNED_EXPIRY = 3600
 
+# Event loop kept across warm invocations (asyncio.run would rebuild it and
+# its default thread pool on every request); created on first use.
+_runner = None
+
+# Anything but letters, digits, "-" and "_" becomes "_" in S3 folder names
+_USERNAME_UNSAFE_RE = re.compile(r"[^\w-]")
+
+# SoundCloud track IDs are numeric; they end up in download file names
+_TRACK_ID_RE = re.compile(r"[0-9]+")
+
 
 def validate_request(body: dict) -> tuple[list[Track], str]:
     """Validate and parse the download request. Returns (tracks, username)."""
@@ -48,90 +72,119 @@ def validate_request(body: dict) -> tuple[list[Track], str]:
         if not isinstance(t, dict):
             raise ValidationError(f"Track {i} must be an object")
 
-        # Required fields
+        # Required fields (checked first so invalid tracks fail fast)
         track_id = t.get("id")
+        if not track_id:
+            raise ValidationError(f"Track {i} missing 'id' field")
+        track_id = str(track_id)
+        if not _TRACK_ID_RE.fullmatch(track_id):
+            raise ValidationError(f"Track {i} has an invalid 'id' (must be numeric)")
+
         url = t.get("url") or t.get("permalink_url")
-        title = t.get("title", f"Track {i + 1}")
+        title = t.get("title")
+        if title is None:
+            title = f"Track {i + 1}"
 
         # Artist: prefer `metadata_artist` (coming from SoundCloud metadata),
         # then fall back to existing fields.
+        user = t.get("user")
         artist = (
             t.get("artist") or
             t.get("metadata_artist") or
-            (t.get("user", {}).get("username") if isinstance(t.get("user"), dict) else None) or
+            (user.get("username") if isinstance(user, dict) else None) or
             "Unknown Artist"
         )
 
-        if not track_id:
-            raise ValidationError(f"Track {i} missing 'id' field")
-
         if not url:
             # Build URL from track ID if not provided
             url = f"https://api.soundcloud.com/tracks/{track_id}"
 
+        # Track builds its filename on construction, so non-string values
+        # (e.g. "title": 2024) must be strings by now
         tracks.append(Track(
-            id=str(track_id),
+            id=track_id,
             url=url,
-            title=title,
-            artist=artist
+            title=str(title),
+            artist=str(artist)
         ))
 
     return tracks, username or "xomcloud"
 
 
+async def upload_single_track(track: Track, prefix: str) -> tuple[str, list[DownloadResult]]:
+    """Download one track and upload the audio file itself. Returns (s3_key, results)."""
+    async with download_single(track) as result:
+        if not result.success:
+            raise DownloadError("All downloads failed")
+        
+        ext = os.path.splitext(result.file_path)[1].lower()
+        s3_key = f"{prefix}/{track.safe_filename}{ext}"
+        
+        log.info("Uploading track to S3: %s", s3_key)
+        upload_file(
+            result.file_path,
+            s3_key,
+            content_type=AUDIO_CONTENT_TYPES.get(ext, "application/octet-stream")
+        )
+    
+    return s3_key, [result]
+
+
+def _get_runner() -> asyncio.Runner:
+    """Get or create the process-wide asyncio runner."""
+    global _runner
+    if _runner is None:
+        _runner = asyncio.Runner()
+    return _runner
+
+
 async def process_download(tracks: list[Track], username: str) -> dict:
     """Process the download and return result with presigned URL."""
-    log.info(f"Starting download of {len(tracks)} tracks")
-    
-    # Download tracks and create zip
-    zip_path, results = await download_tracks(tracks)
+    log.info("Starting download of %d tracks", len(tracks))
     
     # Generate folder name: username_timestamp
     timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-    safe_username = "".join(c if c.isalnum() or c in "-_" else "_" for c in username)[:30]
+    safe_username = _USERNAME_UNSAFE_RE.sub("_", username[:30])
 
-    s3_key = f"{safe_username}/{timestamp}/xomcloud-tracks.zip"
+    prefix = f"{safe_username}/{timestamp}"
     
-    # Upload to S3
-    log.info(f"Uploading zip to S3: {s3_key}")
-    upload_file(zip_path, s3_key, content_type="application/zip")
+    if len(tracks) == 1:
+        # A lone track is uploaded as-is; zipping it would only add framing
+        s3_key, results = await upload_single_track(tracks[0], prefix)
+    else:
+        s3_key = f"{prefix}/xomcloud-tracks.zip"
+        
+        # Download tracks and stream the zip straight into S3 (aborted on failure)
+        log.info("Streaming zip to S3: %s", s3_key)
+        with open_upload_stream(s3_key, content_type="application/zip") as out:
+            results = await download_tracks(tracks, out)
     
     # Generate presigned URL for download
-    download_url = generate_presigned_url(s3_key, expires_in=PRESIGNED_EXPIRY)
-    
-    # Clean up temp files
-    try:
-        os.remove(zip_path)
-        temp_dir = os.path.dirname(zip_path)
-        if temp_dir and os.path.exists(temp_dir):
-            import shutil
-            shutil.rmtree(temp_dir, ignore_errors=True)
-    except Exception as e:
-        log.warning(f"Failed to clean up temp files: {e}")
+    download_url = generate_presigned_url(
+        s3_key,
+        expires_in=PRESIGNED_EXPIRY,
+        filename=s3_key.rsplit("/", 1)[-1]
+    )
     
-    # Build response with detailed results
-    successful = [r for r in results if r.success]
-    failed = [
-        {
-            "id": r.track.id,
-            "title": r.track.title,
-            "artist": r.track.artist,
-            "error": r.error or "Unknown error"
-        }
-        for r in results if not r.success
-    ]
+    # Build response with detailed results (one pass over the results)
+    downloaded = []
+    failed = []
+    for r in results:
+        info = {"id": r.track.id, "title": r.track.title, "artist": r.track.artist}
+        if r.success:
+            downloaded.append(info)
+        else:
+            info["error"] = r.error or "Unknown error"
+            failed.append(info)
     
     return {
         "download_url": download_url,
         "expires_in": PRESIGNED_EXPIRY,
         "total": len(tracks),
-        "successful": len(successful),
+        "successful": len(downloaded),
         "failed_count": len(failed),
         "failed": failed if failed else None,
-        "tracks_downloaded": [
-            {"id": r.track.id, "title": r.track.title, "artist": r.track.artist}
-            for r in successful
-        ]
+        "tracks_downloaded": downloaded
     }
 
 
@@ -143,20 +196,20 @@ def handler(event: dict, context) -> dict:
         body = parse_body(event)
         tracks, username = validate_request(body)
         
-        log.info(f"Validated {len(tracks)} tracks for download (user: {username})")
+        log.info("Validated %d tracks for download (user: %s)", len(tracks), username)
         
         # Run async download process
-        result = asyncio.run(process_download(tracks, username))
+        result = _get_runner().run(process_download(tracks, username))
         
-        log.info(f"Download complete: {result['successful']}/{result['total']} tracks")
+        log.info("Download complete: %d/%d tracks", result['successful'], result['total'])
         return success(result)
         
     except ValidationError as e:
-        log.warning(f"Validation error: {e}")
+        log.warning("Validation error: %s", e)
         return error(e)
     except DownloadError as e:
-        log.error(f"Download error: {e}")
+        log.error("Download error: %s", e)
         return error(e)
     except Exception as e:
-        log.error(f"Unexpected error: {e}", exc_info=True)
+        log.error("Unexpected error: %s", e, exc_info=True)
         return error(e)